@@ -0,0 +1,309 @@
+"""
+LUNA CONFIDENCE COACH — rewriting engine
+Notes:
+- Domain model and LunaCoach, kept out of app.py so Streamlit reruns reuse
+  the same classes (st.cache_data pickles reports by class reference).
+"""
+
+import io
+import re
+from dataclasses import dataclass
+from enum import Enum
+from typing import List
+from datetime import datetime, timezone
+
+# Optional RE2 engine for the rule scan
+try:
+    import re2
+except ImportError:
+    re2 = None
+
+
+# =========================
+# Domain model
+# =========================
+class ChangeType(Enum):
+    HEDGING_REMOVED = "Hedging removed"
+    UNCERTAINTY_REMOVED = "Uncertainty removed"
+    WEAK_VERB_STRENGTHENED = "Weak verb strengthened"
+    PASSIVE_TO_ACTIVE = "Passive → active"
+    QUESTION_TO_STATEMENT = "Question → statement"
+    QUALIFIER_REMOVED = "Qualifier removed"
+    FILLER_REMOVED = "Filler removed"
+    NEGATIVE_SELF_TALK_REFRAMED = "Negative self-talk reframed"
+    INTENSIFIER_TONED_DOWN = "Intensifier toned down"
+    GRAMMAR_FIXED = "Grammar fixed"
+
+
+@dataclass(slots=True)
+class Transformation:
+    start: int
+    end: int
+    before: str
+    after: str
+    change_type: ChangeType
+    change_type_label: str
+    explanation: str
+    confidence_impact: int
+
+
+@dataclass(slots=True)
+class TransformationReport:
+    original: str
+    transformed: str
+    changes: List[Transformation]
+    confidence_before: float
+    confidence_after: float
+    total_words_removed: int
+    total_changes: int
+    created_at_iso: str
+
+
+@dataclass(slots=True)
+class HistoryEntry:
+    """The slice of a report the dashboard keeps per run."""
+    confidence_before: float
+    confidence_after: float
+    created_at_iso: str
+
+
+# =========================
+# Coach logic
+# =========================
+class LunaCoach:
+    """Confidence writing coach — transparent & educational."""
+
+    PATTERNS = {
+        "hedging": [
+            (r"\bI think that\b", "", "Removes unnecessary thinking phrase.", 15),
+            (r"\bI think\b", "", "States sound stronger without hedging.", 14),
+            (r"\bI believe\b", "", "Belief ≠ evidence; say it directly.", 14),
+            (r"\bI feel like\b", "", "Replace feelings with facts and actions.", 14),
+            (r"\bmaybe\b", "", "Removes hedging to clarify intent.", 10),
+            (r"\bperhaps\b", "", "Removes hedging to clarify intent.", 10),
+            (r"\bpossibly\b", "", "Removes hedging to clarify intent.", 10),
+            (r"\bprobably\b", "", "Removes hedging to clarify intent.", 10),
+            (r"\b(kind|sort) of\b", "", "Eliminates vague qualifiers.", 12),
+            (r"\bbasically\b", "", "Filler that weakens tone.", 8),
+            (r"\bactually\b", "", "Often unnecessary emphasis.", 8),
+        ],
+        "uncertainty": [
+            (r"\bI don't know if\b", "", "State what you can do next.", 20),
+            (r"\bI'm not sure\b", "", "Replace doubt with a decision or plan.", 18),
+            (r"\bnot sure\b", "unclear", "Clarifies uncertainty to a clear term.", 15),
+            (r"\bmixed up\b", "unclear", "Clarifies confusion.", 12),
+        ],
+        "weak_verbs": [
+            (r"\bmight be able to\b", "can", "Choose decisive capability.", 18),
+            (r"\bcould be able to\b", "can", "Choose decisive capability.", 18),
+            (r"\bwould be able to\b", "can", "Choose decisive capability.", 18),
+            (r"\bmight be\b", "is", "Strengthens the claim.", 15),
+            (r"\bcould be\b", "is", "Makes a definitive statement.", 15),
+            (r"\bseems to be\b", "is", "Converts appearance to fact.", 15),
+            (r"\bappears to be\b", "is", "States facts directly.", 15),
+            (r"\btends to be\b", "is", "Smoother assertive phrasing.", 12),
+        ],
+        "passive": [
+            (r"\b(is|are|was|were|be|been|being)\s+\w+(ed|en)\s+by\b", "", "Prefer active voice; name the actor.", 16),
+        ],
+        "questions": [
+            (r"\bWhat do you think\?\b", "", "Avoid validation-seeking; propose an action.", 15),
+            (r"\bShould we\?\b", ".", "Decide and state the plan.", 15),
+            (r"\?\s*$", ".", "Convert question to a decision-oriented statement.", 12),
+        ],
+        "filler": [
+            (r"\bjust\b", "", "Common minimizer; remove to strengthen tone.", 8),
+            (r"\breally\b", "", "Intensifier that rarely adds precision.", 6),
+            (r"\bvery\b", "", "Vague intensifier; replace with specifics.", 6),
+        ],
+        "neg_self": [
+            (r"\bI need your help\b", "", "Shift from dependency to initiative.", 12),
+            (r"\bI'm bad at\b", "I'm improving at", "Reframe into growth.", 14),
+            (r"\bI can't\b", "I can", "Assert capability or next step.", 16),
+            (r"\bI always mess up\b", "I’m learning from errors", "Replace global negative with growth.", 16),
+            (r"\bsorry to bother\b", "", "Remove apology when not needed.", 18),
+        ],
+        "grammar": [
+            (r"\bill\b", "I'll", "Fixes contraction.", 5),
+            (r"\bits\b", "it's", "Adds missing apostrophe where needed.", 5),
+            (r"\bdont\b", "don't", "Fix grammar.", 5),
+            (r"\bdoesnt\b", "doesn't", "Fix grammar.", 5),
+            (r"\bim\b", "I'm", "Fix grammar.", 5),
+            (r"\s{2,}", " ", "Collapse repeated spaces.", 2),
+        ],
+        "intensifiers": [
+            (r"\balways\b", "", "Absolutes can sound reactive; remove or qualify.", 6),
+            (r"\bnever\b", "", "Absolutes can sound reactive; remove or qualify.", 6),
+            (r"\bextremely\b", "", "Over-intense; prefer specifics.", 6),
+            (r"\bhighly\b", "", "Vague intensifier; prefer specifics.", 4),
+        ],
+    }
+
+    # Any rule match in lowercased ASCII text contains one of these substrings,
+    # so text without them skips the stdlib regex scan. Keep in sync with
+    # PATTERNS.
+    TRIGGERS = (
+        "think", "believe", "feel like", "maybe", "perhaps", "possibly", "probably",
+        "kind of", "sort of", "basically", "actually",
+        "know if", "not sure", "mixed up",
+        "able to", "might be", "could be", "seems to", "appears to", "tends to",
+        "by", "?",
+        "just", "really", "very",
+        "your help", "bad at", "can't", "mess up", "sorry",
+        "always", "never", "extremely", "highly",
+        "ill", "its", "dont", "doesnt", "im",
+        "  ", "\t", "\n", "\r", "\x0b", "\x0c", "\x1c", "\x1d", "\x1e", "\x1f",
+    )
+
+    CATEGORY_TO_TYPE = {
+        "hedging": ChangeType.HEDGING_REMOVED,
+        "uncertainty": ChangeType.UNCERTAINTY_REMOVED,
+        "weak_verbs": ChangeType.WEAK_VERB_STRENGTHENED,
+        "passive": ChangeType.PASSIVE_TO_ACTIVE,
+        "questions": ChangeType.QUESTION_TO_STATEMENT,
+        "grammar": ChangeType.GRAMMAR_FIXED,
+        "filler": ChangeType.FILLER_REMOVED,
+        "neg_self": ChangeType.NEGATIVE_SELF_TALK_REFRAMED,
+        "intensifiers": ChangeType.INTENSIFIER_TONED_DOWN,
+    }
+
+    def __init__(self):
+        # One alternation over every rule: a single scan of the text finds all
+        # matches, and the group that fired (g0, g1, ...) picks the rule.
+        # At a shared start the first alternative wins, so longer variants
+        # ("I think that") are placed ahead of their prefixes ("I think").
+        # ChangeType is resolved here once rather than looked up per match.
+        to_type = self.CATEGORY_TO_TYPE
+        flat = [
+            (pattern, (to_type.get(category, ChangeType.QUALIFIER_REMOVED), replacement, explanation, impact))
+            for category, patterns in self.PATTERNS.items()
+            for pattern, replacement, explanation, impact in patterns
+        ]
+        flat.sort(key=lambda item: len(item[0]), reverse=True)
+        alternatives = [f"(?P<g{i}>{pattern})" for i, (pattern, _) in enumerate(flat)]
+        pattern = "|".join(alternatives)
+        self._fused = re.compile(pattern, re.IGNORECASE)
+        # Rules by group number, so a match dispatches on m.lastindex (a plain
+        # int; RE2's lastgroup is rebuilt per call). Rule patterns have inner
+        # groups, hence the groupindex lookup.
+        self._by_index = [None] * (self._fused.groups + 1)
+        for i, (_, rule) in enumerate(flat):
+            self._by_index[self._fused.groupindex[f"g{i}"]] = rule
+        # RE2 scans in linear time instead of backtracking through every
+        # alternative at each position. Its \b, \w and \s are ASCII-only, so it
+        # only serves ASCII text, with \s widened to Python's ASCII whitespace.
+        self._fused_ascii = self._fused
+        if re2 is not None:
+            try:
+                self._fused_ascii = re2.compile("(?i)" + pattern.replace(r"\s", r"[\s\x0b\x1c-\x1f]"))
+            except re2.error:
+                pass
+
+    def _rule(self, m):
+        """(change_type, replacement, explanation, impact) for a fused match."""
+        return self._by_index[m.lastindex]
+
+    def _finditer(self, text: str):
+        fused = self._fused_ascii if text.isascii() else self._fused
+        return fused.finditer(text)
+
+    def _may_match(self, text: str) -> bool:
+        # Non-ASCII text can case-fold or space in ways the substrings miss.
+        # RE2 clears clean ASCII text faster than the lower() copy and
+        # substring tests, so the prefilter only guards the stdlib scan.
+        if not text.isascii() or self._fused_ascii is not self._fused:
+            return True
+        lowered = text.lower()
+        return any(t in lowered for t in self.TRIGGERS)
+
+    def detect_confidence(self, text: str) -> float:
+        if not text or not text.strip():
+            return 100.0
+        return self._score(self._penalty(text), len(text.split()))
+
+    def _penalty(self, text: str) -> int:
+        if not self._may_match(text):
+            return 0
+        rules = self._by_index
+        return sum(rules[m.lastindex][3] for m in self._finditer(text))
+
+    @staticmethod
+    def _score(penalty: int, words: int) -> float:
+        score = max(0.0, 100.0 - (penalty / max(1, words) * 100.0))
+        return min(100.0, score)
+
+    def _iter_matches(self, text: str):
+        if not self._may_match(text):
+            return
+        for m in self._finditer(text):
+            change_type, replacement, explanation, impact = self._rule(m)
+            yield change_type, m, replacement, explanation, impact
+
+    def transform_with_tracking(self, text: str) -> TransformationReport:
+        if not text or not text.strip():
+            now_iso = datetime.now(timezone.utc).isoformat()
+            return TransformationReport(text, text, [], 100.0, 100.0, 0, 0, now_iso)
+
+        original = text
+        words_before = len(original.split())
+
+        # The fused regex yields non-overlapping matches in text order, so the
+        # edits are spliced in directly; confidence_before falls out of the
+        # same pass.
+        buf = io.StringIO()
+        last_idx = 0
+        changes: List[Transformation] = []
+        shift = 0
+        penalty_before = 0
+
+        for change_type, m, replacement, explanation, impact in self._iter_matches(original):
+            start, end = m.span()
+            buf.write(original[last_idx:start])
+            after_text = replacement if replacement is not None else ""
+            buf.write(after_text)
+
+            changes.append(Transformation(
+                start=start + shift,
+                end=end + shift,
+                before=m.group(0),
+                after=after_text if after_text else "[removed]",
+                change_type=change_type,
+                change_type_label=change_type.value,
+                explanation=explanation,
+                confidence_impact=impact,
+            ))
+
+            last_idx = end
+            shift += len(after_text) - (end - start)
+            penalty_before += impact
+
+        buf.write(original[last_idx:])
+        transformed = buf.getvalue()
+        confidence_before = self._score(penalty_before, words_before)
+
+        # split/join collapses runs of whitespace in C, which leaves at most
+        # one plain space before any punctuation.
+        transformed = " ".join(transformed.split())
+        transformed = _SPACE_BEFORE_PUNCT_RE.sub(r"\1", transformed)
+        if transformed:
+            transformed = transformed[0].upper() + transformed[1:]
+
+        # transformed is single-spaced and stripped, so spaces count its words.
+        words_after = transformed.count(" ") + 1 if transformed else 0
+        confidence_after = self._score(self._penalty(transformed), words_after)
+        words_removed = max(0, words_before - words_after)
+        now_iso = datetime.now(timezone.utc).isoformat()
+
+        return TransformationReport(
+            original=original,
+            transformed=transformed,
+            changes=changes,
+            confidence_before=confidence_before,
+            confidence_after=confidence_after,
+            total_words_removed=words_removed,
+            total_changes=len(changes),
+            created_at_iso=now_iso,
+        )
+
+
+_SPACE_BEFORE_PUNCT_RE = re.compile(r" ([.,!?;:])")